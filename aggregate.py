@@ -1,23 +1,21 @@
 # aggregate.py
 
-import json
 from pathlib import Path
 from collections import Counter
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+from engine.artifacts import load_run_summary
 
 def load_final_structs(log_dir: Path):
     runs = []
     for run_path in sorted(log_dir.glob("run_*/summary.json")):
-        with open(run_path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-            runs.append({
-                "name": run_path.parent.name, 
-                "final": data.get("final", ""), 
-                "history": data.get("history", []),
-                "converged": data.get("meta_agent_converged", False),
-                "risks": data.get("risk_summary", [])
-            })
+        # Either artifact format (pretty JSON, or compact header + compressed history)
+        data = load_run_summary(run_path.parent)
+        runs.append({
+            "name": run_path.parent.name, 
+            "final": data.get("final", ""), 
+            "history": data.get("history", []),
+            "converged": data.get("meta_agent_converged", False),
+            "risks": data.get("risk_summary", [])
+        })
     return runs
 
 def summarize_meta_agent(runs, file_handle):
@@ -57,7 +55,9 @@ def summarize_aggregate(runs, out_path):
     if not final_texts or len(final_texts) < 2:
         print("Not enough valid final proposals for aggregation—review agent and meta-agent configs.")
         return
-    # Auto-cluster by final proposal similarity
+    # Auto-cluster by final proposal similarity (scikit-learn is slow to import, so only load it here)
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.metrics.pairwise import cosine_similarity
     vect = TfidfVectorizer().fit_transform([r["final"] for r in runs])
     sim_matrix = cosine_similarity(vect)
     clusters, cluster_map = {}, {}
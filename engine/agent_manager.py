@@ -1,7 +1,7 @@
 # engine/agent_manager.py
 
 import yaml
-from engine.gpt_api import call_gpt
+from engine.gpt_api import call_gpt, call_gpt_many
 from engine.utils import agent_seed
 
 def load_board_config(path="agents_board.yaml"):
@@ -42,26 +42,36 @@ async def check_and_augment_archetypes(agents, required_archetypes, board_member
     log = []
     if missing and verbose:
         print("WARNING: Panel is missing required archetypes: ", missing)
-    # Try to have the board propose an agent for each missing archetype
-    for code in missing:
-        # lookup object for logging
-        archinfo = next((arc for arc in required_archetypes if arc["code"] == code), {"code": code})
-        for bm in board_members:
+    # One board member at a time is asked for every archetype still missing (one batch in
+    # batch mode); whatever it fills is not asked of the next member
+    for bm in board_members:
+        codes = sorted(missing)
+        if not codes:
+            break
+        calls = []
+        for code in codes:
+            # lookup object for logging
+            archinfo = next((arc for arc in required_archetypes if arc["code"] == code), {"code": code})
             prompt = f"Business Premise: {premise}\nProcess: {process_instruction}\n" + \
                      f"A required archetype for deeper critique is missing: [{code}] ({archinfo.get('display','?')})\n" + \
                      f"Description: {archinfo.get('description', '')}\n" + \
                      f"Propose ONE agent with that archetype, strictly with fields: 'name', 'system', 'archetype', 'rationale'."
-            try:
-                candidate_seed = agent_seed(seed, f"{bm['name']}_{code}")
-                candidate = await call_gpt(bm['system'], prompt, expect_json=True, temperature=temperature, seed=candidate_seed)
-                if candidate and "archetype" in candidate and candidate["archetype"] == code:
-                    log.append({"archetype_added": code, "by": bm["name"]})
-                    if verbose:
-                        print(f"Archetype `{code}` injected by Board: {candidate.get('name','UNKNOWN')} from {bm['name']}")
-                    agents.append(candidate)
-                    break
-            except Exception:
-                continue
+            calls.append({
+                "system_prompt": bm["system"],
+                "user_prompt": prompt,
+                "temperature": temperature,
+                "seed": agent_seed(seed, f"{bm['name']}_{code}"),
+                "expect_json": True,
+                "phase": "panel",
+            })
+        results = await call_gpt_many(calls, return_exceptions=True)
+        for code, candidate in zip(codes, results):
+            if isinstance(candidate, dict) and candidate.get("archetype") == code and "name" in candidate and "system" in candidate:
+                log.append({"archetype_added": code, "by": bm["name"]})
+                if verbose:
+                    print(f"Archetype `{code}` injected by Board: {candidate.get('name','UNKNOWN')} from {bm['name']}")
+                agents.append(candidate)
+                missing.discard(code)
     return _deduplicate_agents(agents), log
 
 async def get_panel(board_members, premise, process_instruction, temperature, max_agents, threshold=2,
@@ -73,10 +83,13 @@ async def get_panel(board_members, premise, process_instruction, temperature, ma
     if verbose and present_archetypes:
         print("User-supplied panel archetypes: ", present_archetypes)
     initial_agents = _deduplicate_agents(user_agents)
-    for bm in board_members:
-        agents = await propose_agents(
-            bm, premise, process_instruction, temperature, max_agents, present_archetypes=present_archetypes, seed=master_seed
-        )
+    # Board proposals are independent of each other, so they go out together (one batch in batch mode)
+    results = await call_gpt_many([
+        _proposal_call(bm, premise, process_instruction, temperature, max_agents, present_archetypes=present_archetypes, seed=master_seed)
+        for bm in board_members
+    ])
+    for bm, result in zip(board_members, results):
+        agents = result.get("panel_agents", [])
         valid_agents = []
         for a in agents:
             if "name" in a and "system" in a and "archetype" in a:
@@ -121,7 +134,11 @@ async def get_panel(board_members, premise, process_instruction, temperature, ma
     return combined, proposals, panel_log
 
 async def propose_agents(board_member, premise, process_instruction, temperature, max_agents, present_archetypes=None, seed=None):
-    pres_arch = list(present_archetypes) if present_archetypes else []
+    result = await call_gpt(**_proposal_call(board_member, premise, process_instruction, temperature, max_agents, present_archetypes, seed))
+    return result.get("panel_agents", [])
+
+def _proposal_call(board_member, premise, process_instruction, temperature, max_agents, present_archetypes=None, seed=None):
+    pres_arch = sorted(present_archetypes) if present_archetypes else []
     user_prompt = f"""
     BUSINESS IDEA: {premise}
     PROCESS INSTRUCTION: {process_instruction}
@@ -134,5 +151,11 @@ async def propose_agents(board_member, premise, process_instruction, temperature
     """
     system_prompt = board_member["system"]
     proposal_seed = agent_seed(seed, board_member["name"]) if seed is not None else None
-    result = await call_gpt(system_prompt, user_prompt, temperature=temperature, expect_json=True, seed=proposal_seed)
-    return result.get("panel_agents", [])
\ No newline at end of file
+    return {
+        "system_prompt": system_prompt,
+        "user_prompt": user_prompt,
+        "temperature": temperature,
+        "expect_json": True,
+        "seed": proposal_seed,
+        "phase": "panel",
+    }
\ No newline at end of file
@@ -0,0 +1,123 @@
+# engine/artifacts.py
+# Run artifacts on disk.
+#   json    (default): pretty summary.json + summary.md, as always
+#   compact          : compact summary.json header + zstd/gzip-compressed history JSONL,
+#                      Markdown rendered on demand (python -m engine.artifacts logs/<run_id>)
+# Both formats write index.csv: one row of metrics per iteration, for fast cross-run analytics.
+
+import csv
+import gzip
+import io
+import json
+import sys
+from pathlib import Path
+from engine.utils import atomic_write_json, write_human_log_markdown
+
+ARTIFACT_FORMATS = ("json", "compact")
+INDEX_FILE = "index.csv"
+INDEX_COLUMNS = [
+    "iteration", "entropy", "halt", "critiques", "open_risks", "user_questions",
+    "calls", "prompt_tokens", "completion_tokens", "latency_s",
+]
+
+def compressed_suffix():
+    # zstd when the optional `zstandard` package is installed, gzip otherwise
+    try:
+        import zstandard  # noqa: F401
+        return ".zst"
+    except ImportError:
+        return ".gz"
+
+def open_text(path, mode="rt"):
+    """Open a (possibly .zst/.gz compressed) text file; mode is 'rt' or 'wt'."""
+    path = str(path)
+    if path.endswith(".zst"):
+        import zstandard
+        if "r" in mode:
+            return io.TextIOWrapper(zstandard.ZstdDecompressor().stream_reader(open(path, "rb")), encoding="utf-8")
+        return io.TextIOWrapper(zstandard.ZstdCompressor(level=10).stream_writer(open(path, "wb")), encoding="utf-8")
+    if path.endswith(".gz"):
+        return gzip.open(path, mode, encoding="utf-8")
+    return open(path, mode[0], encoding="utf-8")
+
+def compress_file(path):
+    """Replace `path` by a compressed copy; returns the new path."""
+    path = Path(path)
+    target = path.with_name(path.name + compressed_suffix())
+    with open(path, "r", encoding="utf-8") as src, open_text(target, "wt") as dst:
+        for line in src:
+            dst.write(line)
+    path.unlink()
+    return target
+
+def index_rows(history):
+    rows = []
+    for step in history:
+        metrics = step.get("metrics", {})
+        synthesis = step.get("synthesis") or {}
+        rows.append({
+            "iteration": step.get("iteration"),
+            "entropy": step.get("entropy"),
+            "halt": int(bool((step.get("meta_decision") or {}).get("halt"))),
+            "critiques": sum(len(c) if isinstance(c, list) else 1 for c in step.get("critiques", {}).values()),
+            "open_risks": len(synthesis.get("open_risks", []) or []) if isinstance(synthesis, dict) else 0,
+            "user_questions": len(step.get("user_answers", {})),
+            "calls": metrics.get("calls", 0),
+            "prompt_tokens": metrics.get("prompt_tokens", 0),
+            "completion_tokens": metrics.get("completion_tokens", 0),
+            "latency_s": metrics.get("latency_s", 0.0),
+        })
+    return rows
+
+def write_run_artifacts(outdir, summary, fmt="json"):
+    outdir = Path(outdir)
+    outdir.mkdir(parents=True, exist_ok=True)
+    history = summary.get("history", [])
+    with open(outdir / INDEX_FILE, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=INDEX_COLUMNS)
+        writer.writeheader()
+        writer.writerows(index_rows(history))
+    if fmt == "compact":
+        history_file = "history.jsonl" + compressed_suffix()
+        with open_text(outdir / history_file, "wt") as f:
+            for step in history:
+                f.write(json.dumps(step, ensure_ascii=False, separators=(",", ":")) + "\n")
+        header = {k: v for k, v in summary.items() if k != "history"}
+        header.update({"artifact_format": "compact", "history_file": history_file})
+        # Header last: a run counts as written once its summary.json exists
+        atomic_write_json(outdir / "summary.json", header, indent=None)
+        # A Markdown log left over from an earlier json-format run would no longer match
+        (outdir / "summary.md").unlink(missing_ok=True)
+        return
+    atomic_write_json(outdir / "summary.json", summary)
+    write_human_log_markdown(outdir / "summary.md", summary)
+
+def load_run_summary(run_dir):
+    """summary.json of a run in either format, with `history` always inlined."""
+    run_dir = Path(run_dir)
+    with open(run_dir / "summary.json", "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("history_file"):
+        with open_text(run_dir / data["history_file"]) as f:
+            data["history"] = [json.loads(line) for line in f if line.strip()]
+    return data
+
+def load_index(log_dir):
+    """All runs' index.csv rows, each tagged with its run name."""
+    rows = []
+    for index_path in sorted(Path(log_dir).glob(f"*/{INDEX_FILE}")):
+        with open(index_path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                row["run"] = index_path.parent.name
+                rows.append(row)
+    return rows
+
+def render_markdown(run_dir, out_path=None):
+    run_dir = Path(run_dir)
+    out_path = out_path or run_dir / "summary.md"
+    write_human_log_markdown(out_path, load_run_summary(run_dir))
+    return out_path
+
+if __name__ == "__main__":
+    for run_dir in sys.argv[1:]:
+        print(f"Markdown log written to {render_markdown(run_dir)}")
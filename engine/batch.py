@@ -0,0 +1,214 @@
+# engine/batch.py
+# Batch execution mode for unattended replicate sweeps.
+# Replicates run concurrently; every request they issue is parked until ALL live replicates
+# are waiting, then the whole phase goes out as one batch file (provider Batch API, or a
+# local file-based stand-in), and each replicate resumes with its results.
+
+import asyncio
+import hashlib
+import json
+import logging
+from contextvars import ContextVar
+from pathlib import Path
+from engine.utils import atomic_write_json
+
+CHAT_ENDPOINT = "/v1/chat/completions"
+TERMINAL_STATES = {"completed", "failed", "expired", "cancelled"}
+# Body fields that don't identify a batch for resuming (learned token budgets drift)
+RESUME_IGNORED_FIELDS = ("max_tokens",)
+
+_collector = ContextVar("batch_collector", default=None)
+
+def active_batch():
+    return _collector.get()
+
+def start_batch(collector):
+    _collector.set(collector)
+    return collector
+
+class OpenAIBatchBackend:
+    """Provider Batch API: upload jsonl, create batch, poll, download output jsonl."""
+    def __init__(self, client, completion_window="24h"):
+        self.client = client
+        self.completion_window = completion_window
+
+    async def submit(self, input_path):
+        with open(input_path, "rb") as f:
+            uploaded = await self.client.files.create(file=f, purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=uploaded.id,
+            endpoint=CHAT_ENDPOINT,
+            completion_window=self.completion_window,
+        )
+        return batch.id
+
+    async def status(self, batch_id):
+        batch = await self.client.batches.retrieve(batch_id)
+        return batch.status, {"output_file_id": batch.output_file_id, "error_file_id": batch.error_file_id}
+
+    async def results(self, batch_id, info):
+        lines = []
+        for file_id in (info.get("output_file_id"), info.get("error_file_id")):
+            if file_id:
+                content = await self.client.files.content(file_id)
+                lines.extend(l for l in content.text.splitlines() if l.strip())
+        return [json.loads(l) for l in lines]
+
+class LocalBatchBackend:
+    """
+    File-based stand-in for the provider Batch API (tests, debugging).
+    `responder(body) -> str` produces the assistant message content for one request body.
+    """
+    def __init__(self, directory, responder):
+        self.directory = Path(directory)
+        self.responder = responder
+
+    async def submit(self, input_path):
+        batch_id = f"local_{Path(input_path).stem}"
+        out_lines = []
+        with open(input_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                try:
+                    content = await self.responder(item["body"])
+                    out_lines.append({
+                        "custom_id": item["custom_id"],
+                        "response": {"status_code": 200, "body": {
+                            "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                        }},
+                        "error": None,
+                    })
+                except Exception as e:
+                    out_lines.append({"custom_id": item["custom_id"], "response": None, "error": {"message": repr(e)}})
+        with open(self.directory / f"{batch_id}_output.jsonl", "w", encoding="utf-8") as f:
+            for o in out_lines:
+                f.write(json.dumps(o, ensure_ascii=False) + "\n")
+        return batch_id
+
+    async def status(self, batch_id):
+        return "completed", {"output_path": str(self.directory / f"{batch_id}_output.jsonl")}
+
+    async def results(self, batch_id, info):
+        with open(info["output_path"], "r", encoding="utf-8") as f:
+            return [json.loads(l) for l in f if l.strip()]
+
+def _resume_key(bodies):
+    stable = [{k: v for k, v in body.items() if k not in RESUME_IGNORED_FIELDS} for body in bodies]
+    return json.dumps(stable, ensure_ascii=False, sort_keys=True)
+
+class BatchCollector:
+    """
+    Barrier between concurrently running replicates.
+    submit() parks a list of request bodies; once every registered replicate is parked,
+    the pending requests are flushed as one batch. Results are completion bodies, or None
+    for requests the batch failed to answer (callers fall back to an interactive call).
+    """
+    def __init__(self, backend, directory="batches", poll_interval=30.0, verbose=False):
+        self.backend = backend
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.poll_interval = poll_interval
+        self.verbose = verbose
+        self.active = 0
+        self.pending = []
+        self.flushing = False
+        self.batches = 0
+        self.digests = []    # manifest entries used by this sweep
+        self.manifest_path = self.directory / "manifest.json"
+        self.manifest = {}
+        if self.manifest_path.is_file():
+            with open(self.manifest_path, "r", encoding="utf-8") as f:
+                self.manifest = json.load(f)
+
+    def register(self):
+        # Register every replicate BEFORE any of them starts, or the first one flushes alone
+        self.active += 1
+
+    def release(self):
+        self.active -= 1
+        self._maybe_flush()
+
+    async def submit(self, bodies):
+        fut = asyncio.get_running_loop().create_future()
+        self.pending.append((bodies, fut))
+        self._maybe_flush()
+        return await fut
+
+    def finish(self):
+        """Sweep completed: drop its manifest entries so a re-run submits fresh batches."""
+        for digest in self.digests:
+            self.manifest.pop(digest, None)
+        self.digests = []
+        atomic_write_json(self.manifest_path, self.manifest)
+
+    def _forget(self, digest):
+        self.manifest.pop(digest, None)
+        atomic_write_json(self.manifest_path, self.manifest)
+
+    def _maybe_flush(self):
+        if self.flushing or not self.pending or len(self.pending) < self.active:
+            return
+        parked, self.pending = self.pending, []
+        self.flushing = True
+        asyncio.ensure_future(self._flush(parked))
+
+    async def _flush(self, parked):
+        try:
+            results = await self._run_batch([b for bodies, _ in parked for b in bodies])
+            pos = 0
+            for bodies, fut in parked:
+                fut.set_result(results[pos:pos + len(bodies)])
+                pos += len(bodies)
+        except Exception as e:
+            for _, fut in parked:
+                if not fut.done():
+                    fut.set_exception(e)
+        finally:
+            self.flushing = False
+            self._maybe_flush()
+
+    async def _run_batch(self, bodies):
+        lines = [
+            {"custom_id": f"req-{i}", "method": "POST", "url": CHAT_ENDPOINT, "body": body}
+            for i, body in enumerate(bodies)
+        ]
+        payload = "".join(json.dumps(l, ensure_ascii=False, sort_keys=True) + "\n" for l in lines)
+        # Seeds make the prompts deterministic, so identical requests mean the same batch:
+        # re-running an interrupted sweep picks up already-submitted batches instead of paying twice.
+        digest = hashlib.md5(_resume_key(bodies).encode("utf-8")).hexdigest()
+        self.batches += 1
+        batch_id = self.manifest.get(digest)
+        if batch_id is None:
+            input_path = self.directory / f"batch_{digest[:12]}_input.jsonl"
+            with open(input_path, "w", encoding="utf-8") as f:
+                f.write(payload)
+            batch_id = await self.backend.submit(input_path)
+            self.manifest[digest] = batch_id
+            atomic_write_json(self.manifest_path, self.manifest)
+        self.digests.append(digest)
+        if self.verbose:
+            print(f"[BATCH {self.batches}] {len(bodies)} requests submitted as {batch_id}", flush=True)
+        try:
+            while True:
+                state, info = await self.backend.status(batch_id)
+                if state in TERMINAL_STATES:
+                    break
+                await asyncio.sleep(self.poll_interval)
+            items = await self.backend.results(batch_id, info)
+        except Exception:
+            # e.g. the provider already deleted the batch or its output: don't resume it again
+            self._forget(digest)
+            raise
+        if state != "completed":
+            logging.warning(f"Batch {batch_id} ended as '{state}'; unanswered requests fall back to interactive calls")
+        by_id = {}
+        for item in items:
+            response = item.get("response") or {}
+            if response.get("status_code") == 200:
+                by_id[item["custom_id"]] = response.get("body")
+        if state != "completed" or len(by_id) < len(bodies):
+            # Don't resume a broken batch on the next run
+            self._forget(digest)
+        return [by_id.get(l["custom_id"]) for l in lines]
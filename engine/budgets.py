@@ -0,0 +1,75 @@
+# engine/budgets.py
+# Per-phase output budgets (max_tokens) for call_gpt.
+# Starts from configured values and adapts to the output sizes actually observed per phase,
+# so JSON-heavy phases stop getting truncated and short meta decisions stop over-reserving.
+# A budget set explicitly in config is an upper limit: learning may only shrink it.
+
+import json
+import math
+from pathlib import Path
+from engine.utils import atomic_write_json
+
+DEFAULT_BUDGETS = {
+    "panel": 1500,       # board proposals / archetype injection
+    "critique": 1400,
+    "crossfire": 900,
+    "synthesis": 1600,
+    "meta": 400,
+    "default": 1024,
+}
+STATE_PATH = Path(".cache") / "output_budgets.json"
+
+class OutputBudgets:
+    def __init__(self, configured=None, adaptive=True, state_path=STATE_PATH,
+                 floor=128, ceiling=4096, headroom=1.3, window=50, min_samples=5):
+        self.configured = dict(DEFAULT_BUDGETS)
+        self.configured.update(configured or {})
+        self.limits = dict(configured or {})   # explicitly configured phases
+        self.adaptive = adaptive
+        self.state_path = Path(state_path) if state_path else None
+        self.floor = floor
+        self.ceiling = ceiling
+        self.headroom = headroom
+        self.window = window
+        self.min_samples = min_samples
+        self.observed = {}   # phase -> recent completion token counts
+        self.truncations = {}
+        if adaptive and self.state_path and self.state_path.is_file():
+            try:
+                with open(self.state_path, "r", encoding="utf-8") as f:
+                    state = json.load(f)
+                self.observed = {k: list(v)[-window:] for k, v in state.get("observed", {}).items()}
+                self.truncations = state.get("truncations", {})
+            except (OSError, ValueError):
+                pass
+
+    def budget_for(self, phase):
+        phase = phase or "default"
+        base = self.configured.get(phase, self.configured["default"])
+        samples = self.observed.get(phase, [])
+        if not self.adaptive or len(samples) < self.min_samples:
+            return base
+        ordered = sorted(samples)
+        p95 = ordered[min(len(ordered) - 1, math.ceil(0.95 * len(ordered)) - 1)]
+        ceiling = min(self.ceiling, self.limits.get(phase, self.ceiling))
+        return int(min(ceiling, max(self.floor, p95 * self.headroom)))
+
+    def observe(self, phase, completion_tokens, truncated=False):
+        """completion_tokens: total output size of the call, continuations included."""
+        if not completion_tokens:
+            return
+        phase = phase or "default"
+        samples = self.observed.setdefault(phase, [])
+        samples.append(int(completion_tokens))
+        del samples[:-self.window]
+        if truncated:
+            self.truncations[phase] = self.truncations.get(phase, 0) + 1
+
+    def save(self):
+        if not (self.adaptive and self.state_path):
+            return
+        try:
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(self.state_path, {"observed": self.observed, "truncations": self.truncations})
+        except OSError:
+            pass  # learned budgets are an optimization only
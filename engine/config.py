@@ -0,0 +1,202 @@
+# engine/config.py
+# One-time loading + schema validation of all run configs into an immutable RunConfig.
+# The parsed/validated YAML is cached on disk keyed by (path, mtime, size) of every
+# source file, so repeated CLI invocations skip YAML parsing and board hashing entirely.
+
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from engine.artifacts import ARTIFACT_FORMATS
+from engine.utils import load_yaml, file_hash, atomic_write_json
+
+CACHE_DIR = Path(".cache") / "config"
+CACHE_VERSION = 1   # bump when the compiled layout changes
+REQUIRED_AGENT_FIELDS = {"name", "system"}
+
+class ConfigError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class RunConfig:
+    premise: str
+    process_instruction: str
+    max_iter: int
+    multi_run: int
+    seed: int
+    verbose: bool
+    agent_cap: int
+    board_threshold: int
+    board_temp: float
+    panel_agent_temp: float
+    debate_temp: float
+    batch: str
+    batch_dir: str
+    batch_poll: float
+    output_budgets: MappingProxyType
+    adaptive_budgets: bool
+    max_context_chars: int
+    artifact_format: str
+    meta_agent_path: str
+    board_path: str
+    user_agents_path: str
+    required_archetypes_path: str
+    # Loaded + validated config contents, deep-frozen (mappings -> MappingProxyType, lists -> tuples);
+    # use thaw() for a plain, JSON-serializable copy
+    meta_agent: MappingProxyType
+    board_members: tuple
+    user_agents: tuple
+    required_archetypes: tuple
+    board_hash: str
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+def thaw(value):
+    """Plain dict/list copy of a frozen RunConfig field."""
+    if isinstance(value, MappingProxyType):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+def _stamp(path):
+    st = os.stat(path)
+    return [os.path.abspath(path), st.st_mtime_ns, st.st_size]
+
+def _cached(paths, build):
+    """Return build() from the on-disk cache if none of `paths` changed since it was stored."""
+    key_src = json.dumps([CACHE_VERSION, [_stamp(p) for p in paths]])
+    cache_file = CACHE_DIR / f"{hashlib.md5(key_src.encode('utf-8')).hexdigest()}.json"
+    try:
+        with open(cache_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        pass
+    compiled = build()
+    try:
+        # Only cache what JSON round-trips exactly (e.g. int mapping keys would come back as str)
+        if json.loads(json.dumps(compiled)) == compiled:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            atomic_write_json(cache_file, compiled)
+    except (OSError, TypeError, ValueError):
+        pass  # cache is an optimization only
+    return compiled
+
+def load_yaml_cached(path):
+    return _cached([path], lambda: load_yaml(path))
+
+def _check_agents(agents, path, key):
+    if not isinstance(agents, list):
+        raise ConfigError(f"'{key}' in '{path}' must be a list")
+    for agent in agents:
+        missing = REQUIRED_AGENT_FIELDS - set(agent or {})
+        if missing:
+            raise ConfigError(f"Entry in '{key}' of '{path}' missing fields: {sorted(missing)}")
+
+def check_output_budgets(budgets):
+    if not budgets:
+        return {}
+    if not isinstance(budgets, dict):
+        raise ConfigError("'output_budgets' must be a mapping of phase -> max_tokens")
+    for phase, tokens in budgets.items():
+        if not isinstance(tokens, int) or tokens <= 0:
+            raise ConfigError(f"Invalid output budget for phase '{phase}': {tokens}")
+    return dict(budgets)
+
+def _compile(meta_agent_path, board_path, user_agents_path, required_archetypes_path):
+    meta = load_yaml(meta_agent_path) or {}
+    if "meta_agent" not in meta:
+        raise ConfigError(f"Missing 'meta_agent' key in '{meta_agent_path}'")
+    _check_agents([meta["meta_agent"]], meta_agent_path, "meta_agent")
+
+    board = load_yaml(board_path) or {}
+    if "board_members" not in board:
+        raise ConfigError(f"Missing 'board_members' key in '{board_path}'")
+    _check_agents(board["board_members"], board_path, "board_members")
+
+    user_agents = []
+    if user_agents_path:
+        loaded = load_yaml(user_agents_path) or {}
+        if "agents" not in loaded:
+            raise ConfigError(f"Missing 'agents' key in '{user_agents_path}'")
+        user_agents = loaded["agents"]
+        _check_agents(user_agents, user_agents_path, "agents")
+
+    req_arch_loaded = load_yaml(required_archetypes_path) or {}
+    if "required_archetypes" not in req_arch_loaded:
+        raise ConfigError(f"Missing 'required_archetypes' in '{required_archetypes_path}'")
+    required_archetypes = req_arch_loaded["required_archetypes"]
+    for arch in required_archetypes:
+        if not isinstance(arch, dict) or "code" not in arch:
+            raise ConfigError(f"Archetype entry without 'code' in '{required_archetypes_path}': {arch}")
+
+    return {
+        "meta_agent": meta["meta_agent"],
+        "board_members": board["board_members"],
+        "user_agents": user_agents,
+        "required_archetypes": required_archetypes,
+        "board_hash": file_hash(board_path),
+    }
+
+def build_run_config(cfg: dict) -> RunConfig:
+    """Validate a merged (CLI > config > defaults) dict and load every referenced YAML once."""
+    missing_keys = [k for k in ("premise", "process_instruction") if not cfg.get(k)]
+    if missing_keys:
+        raise ConfigError(f"Required fields missing: {', '.join(missing_keys)}. (Supply in config or CLI)")
+    if cfg.get("batch") not in (None, "openai", "local"):
+        raise ConfigError(f"Unknown batch mode '{cfg['batch']}' (expected 'openai' or 'local')")
+    if cfg.get("artifact_format") not in (None,) + ARTIFACT_FORMATS:
+        raise ConfigError(f"Unknown artifact format '{cfg['artifact_format']}' (expected 'json' or 'compact')")
+    sources = [
+        ("Meta-agent file", cfg["meta_agent"]),
+        ("Board file", cfg["board"]),
+        ("User agent archetype file", cfg.get("user_agents")),
+        ("Archetypes file", cfg["required_archetypes"]),
+    ]
+    for label, path in sources:
+        if path and not os.path.isfile(path):
+            raise ConfigError(f"{label} '{path}' not found.")
+    paths = [p for _, p in sources if p]
+    compiled = _cached(paths, lambda: _compile(*[p for _, p in sources]))
+    try:
+        run_cfg = RunConfig(
+            premise=cfg["premise"],
+            process_instruction=cfg["process_instruction"],
+            max_iter=int(cfg["max_iter"]),
+            multi_run=int(cfg["multi_run"]),
+            seed=int(cfg["seed"]),
+            verbose=bool(cfg["verbose"]),
+            agent_cap=int(cfg["agent_cap"]),
+            board_threshold=int(cfg["board_threshold"]),
+            board_temp=float(cfg["board_temp"]),
+            panel_agent_temp=float(cfg["panel_agent_temp"]),
+            debate_temp=float(cfg["debate_temp"]),
+            batch=cfg.get("batch"),
+            batch_dir=str(cfg.get("batch_dir") or "batches"),
+            batch_poll=float(cfg.get("batch_poll") or 30.0),
+            output_budgets=_freeze(check_output_budgets(cfg.get("output_budgets"))),
+            adaptive_budgets=cfg.get("adaptive_budgets") is not False,
+            max_context_chars=int(cfg.get("max_context_chars") or 0),
+            artifact_format=cfg.get("artifact_format") or "json",
+            meta_agent_path=cfg["meta_agent"],
+            board_path=cfg["board"],
+            user_agents_path=cfg.get("user_agents"),
+            required_archetypes_path=cfg["required_archetypes"],
+            meta_agent=_freeze(compiled["meta_agent"]),
+            board_members=_freeze(compiled["board_members"]),
+            user_agents=_freeze(compiled["user_agents"]),
+            required_archetypes=_freeze(compiled["required_archetypes"]),
+            board_hash=compiled["board_hash"],
+        )
+    except (TypeError, ValueError) as e:
+        raise ConfigError(f"Invalid config value: {e}")
+    if run_cfg.multi_run < 1:
+        raise ConfigError(f"'multi_run' must be at least 1 (got {run_cfg.multi_run})")
+    return run_cfg
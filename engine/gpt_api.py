@@ -5,12 +5,95 @@
 import logging
 import os
 import json
-from openai import AsyncOpenAI
-from dotenv import load_dotenv
+from contextvars import ContextVar
+from engine.replay import RecordedCallError, active_recorder, active_replayer
+from engine.batch import active_batch
 
-load_dotenv()
-client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
-MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini") # update as needed
+# The client (and .env parsing) is created on first use, so importing this module
+# stays cheap and replay runs never touch the OpenAI SDK at all.
+_client = None
+MODEL = None
+_budgets = None     # engine.budgets.OutputBudgets, set by the runner
+_limiter = None     # engine.ratelimit.RateLimiter, shared by every run in the process (server mode)
+_usage = ContextVar("gpt_usage", default=None)   # per-run token/call counters
+MAX_CONTINUATIONS = 2
+CONTINUE_PROMPT = (
+    "Your previous answer was cut off by the length limit. "
+    "Continue EXACTLY where it stopped: no repetition, no preamble, no codefence."
+)
+
+def _load_env():
+    global MODEL
+    if MODEL is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        MODEL = os.getenv("OPENAI_MODEL", "gpt-4.1-mini") # update as needed
+    return MODEL
+
+def get_client():
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+        _load_env()
+        _client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+    return _client
+
+def set_rate_limiter(limiter):
+    global _limiter
+    _limiter = limiter
+    return limiter
+
+def start_usage_tracking():
+    usage = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+    _usage.set(usage)
+    return usage
+
+def usage_snapshot():
+    usage = _usage.get()
+    return dict(usage) if usage is not None else {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+def _count_usage(usage):
+    counters = _usage.get()
+    if counters is None:
+        return
+    counters["calls"] += 1
+    if usage is None:
+        return
+    if not isinstance(usage, dict):
+        usage = {"prompt_tokens": getattr(usage, "prompt_tokens", 0), "completion_tokens": getattr(usage, "completion_tokens", 0)}
+    counters["prompt_tokens"] += usage.get("prompt_tokens") or 0
+    counters["completion_tokens"] += usage.get("completion_tokens") or 0
+
+async def _create(body):
+    if _limiter is None:
+        response = await get_client().chat.completions.create(**body)
+    else:
+        async with _limiter:
+            response = await get_client().chat.completions.create(**body)
+    _count_usage(getattr(response, "usage", None))
+    return response
+
+def set_output_budgets(budgets):
+    global _budgets
+    _budgets = budgets
+    return budgets
+
+def get_output_budgets():
+    return _budgets
+
+def _max_tokens_for(phase):
+    return _budgets.budget_for(phase) if _budgets is not None else 1024
+
+def _observe(request, completion_tokens, truncated):
+    if _budgets is not None:
+        _budgets.observe(request.get("phase"), completion_tokens, truncated)
+
+def _completion_tokens(usage):
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get("completion_tokens") or 0
+    return getattr(usage, "completion_tokens", 0) or 0
 
 def force_json_instruction(prompt) -> str:
     # Adds a hard "return ONLY valid JSON" line
@@ -22,36 +105,159 @@ def force_json_instruction(prompt) -> str:
         "This instruction is mandatory."
     )
 
+def chat_body(request, user_message=None):
+    """Chat-completions request body for a call_gpt request (shared by live and batch calls)."""
+    if user_message is None:
+        user_message = force_json_instruction(request["user"]) if request["expect_json"] else request["user"]
+    body = {
+        "model": _load_env(),
+        "messages": [
+            {"role": "system", "content": request["system"]},
+            {"role": "user", "content": user_message}
+        ],
+        "temperature": request["temperature"],
+        "max_tokens": request["max_tokens"],
+        "seed": request["seed"],
+    }
+    if request["expect_json"]:
+        body["response_format"] = {"type": "json_object"}
+    return body
+
 async def call_gpt(
     system_prompt,
     user_prompt,
     temperature=0.7,
     seed=None,
-    max_tokens=1024,
-    expect_json=False
+    max_tokens=None,
+    expect_json=False,
+    phase=None,
 ):
+    # max_tokens=None -> per-phase budget (configured, then learned from observed output sizes)
+    results = await call_gpt_many([{
+        "system_prompt": system_prompt,
+        "user_prompt": user_prompt,
+        "temperature": temperature,
+        "seed": seed,
+        "max_tokens": max_tokens,
+        "expect_json": expect_json,
+        "phase": phase,
+    }])
+    return results[0]
+
+async def call_gpt_many(calls, return_exceptions=False):
+    """
+    Issue several independent call_gpt requests (list of call_gpt kwargs dicts).
+    Interactive mode runs them one by one, in order; batch mode ships them in one batch.
+    With return_exceptions=True a failed request yields its exception instead of aborting the rest.
+    """
+    requests = [{
+        "system": c["system_prompt"],
+        "user": c["user_prompt"],
+        "temperature": c.get("temperature", 0.7),
+        "seed": c.get("seed"),
+        "expect_json": c.get("expect_json", False),
+        "max_tokens": c.get("max_tokens") or _max_tokens_for(c.get("phase")),
+        "phase": c.get("phase"),
+    } for c in calls]
+    # Replay mode: serve the recorded responses (and recorded failures), no API call at all
+    replayer = active_replayer()
+    if replayer is not None:
+        results = []
+        for r in requests:
+            try:
+                results.append(replayer.response_for("gpt", r))
+            except RecordedCallError as e:
+                if not return_exceptions:
+                    raise
+                results.append(e)
+        return results
+    collector = active_batch()
+    if collector is not None:
+        completions = await collector.submit([chat_body(r) for r in requests])
+        pending = [_result_from_batch(r, c) for r, c in zip(requests, completions)]
+    else:
+        pending = [_call_gpt_live(r) for r in requests]
+    # Failures are recorded too, so a replay fails (or tolerates) the same calls
+    recorder = active_recorder()
+    results = []
+    for r, coro in zip(requests, pending):
+        try:
+            result = await coro
+        except Exception as e:
+            if recorder is not None:
+                recorder.record("gpt", r, None, error=repr(e))
+            if not return_exceptions:
+                for rest in pending[len(results) + 1:]:
+                    rest.close()
+                raise
+            result = e
+        else:
+            if recorder is not None:
+                recorder.record("gpt", r, result)
+        results.append(result)
+    return results
+
+async def _result_from_batch(request, completion):
+    # Anything the batch could not answer cleanly goes through the interactive path (incl. JSON repair)
+    if completion is None:
+        return await _call_gpt_live(request)
+    _count_usage(completion.get("usage"))
+    choice = completion["choices"][0]
+    resp = choice["message"].get("content") or ""
+    tokens = _completion_tokens(completion.get("usage"))
+    truncated = choice.get("finish_reason") == "length"
+    if truncated:
+        resp, extra = await _continue_truncated(request, None, resp)
+        tokens += extra
+    _observe(request, tokens, truncated)
+    resp = resp.strip()
+    if not request["expect_json"]:
+        return resp
+    try:
+        return json.loads(resp)
+    except json.JSONDecodeError:
+        logging.warning("Batch output was not valid JSON, retrying interactively")
+        return await _call_gpt_live(request)
+
+async def _continue_truncated(request, user_message, text):
+    """Bounded continuation of a length-truncated answer; returns (full text, extra completion tokens)."""
+    extra_tokens = 0
+    for _ in range(MAX_CONTINUATIONS):
+        body = chat_body(request, user_message)
+        body.pop("response_format", None)   # the continuation is a fragment, not a JSON object
+        body["messages"] += [
+            {"role": "assistant", "content": text},
+            {"role": "user", "content": CONTINUE_PROMPT},
+        ]
+        response = await _create(body)
+        choice = response.choices[0]
+        text += choice.message.content or ""
+        extra_tokens += _completion_tokens(getattr(response, "usage", None))
+        if choice.finish_reason != "length":
+            break
+    else:
+        logging.warning(f"Output still truncated after {MAX_CONTINUATIONS} continuations (phase={request.get('phase')})")
+    return text, extra_tokens
+
+async def _call_gpt_live(request):
+    user_prompt = request["user"]
     tries = 2
-    user_message = user_prompt
-    use_response_format = {}
-    if expect_json:
-        user_message = force_json_instruction(user_prompt)
-        use_response_format = {"type": "json_object"}
+    user_message = None
     for attempt in range(tries):
         try:
-            response = await client.chat.completions.create(
-                model=MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_message}
-                ],
-                temperature=temperature,
-                max_tokens=max_tokens,
-                seed=seed,
-                **({"response_format": use_response_format} if expect_json else {})
-            )
+            response = await _create(chat_body(request, user_message))
+            choice = response.choices[0]
+            resp = choice.message.content or ""
+            tokens = _completion_tokens(getattr(response, "usage", None))
+            # Cut off by max_tokens: continue the answer instead of paying for a JSON repair
+            truncated = choice.finish_reason == "length"
+            if truncated:
+                resp, extra = await _continue_truncated(request, user_message, resp)
+                tokens += extra
+            _observe(request, tokens, truncated)
             # [OpenAI guarantees JSON if you do the above right]
-            resp = response.choices[0].message.content.strip()
-            if expect_json:
+            resp = resp.strip()
+            if request["expect_json"]:
                 try:
                     return json.loads(resp)
                 except Exception as e:
@@ -0,0 +1,96 @@
+# engine/jobqueue.py
+# Durable on-disk job queue (SQLite) for server mode.
+# Jobs survive restarts: anything left 'running' by a dead server is queued again on open.
+
+import json
+import sqlite3
+import time
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    tenant TEXT NOT NULL,
+    priority INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'queued',
+    payload TEXT NOT NULL,
+    result TEXT,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_pick ON jobs (status, priority DESC, id);
+"""
+STATUSES = ("queued", "running", "done", "failed")
+
+class JobQueue:
+    def __init__(self, path="jobs.sqlite3"):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.requeued = self.db.execute(
+            "UPDATE jobs SET status='queued', started=NULL WHERE status='running'"
+        ).rowcount
+        self.db.commit()
+
+    def submit(self, payload, tenant="default", priority=0):
+        cur = self.db.execute(
+            "INSERT INTO jobs (tenant, priority, payload, created) VALUES (?, ?, ?, ?)",
+            (tenant, int(priority), json.dumps(payload, ensure_ascii=False), time.time()),
+        )
+        self.db.commit()
+        return cur.lastrowid
+
+    def claim_next(self, blocked_tenants=()):
+        """Highest priority, oldest first, skipping tenants at their concurrency cap."""
+        blocked = list(blocked_tenants)
+        query = "SELECT * FROM jobs WHERE status='queued'"
+        if blocked:
+            query += f" AND tenant NOT IN ({','.join('?' * len(blocked))})"
+        query += " ORDER BY priority DESC, id ASC LIMIT 1"
+        row = self.db.execute(query, blocked).fetchone()
+        if row is None:
+            return None
+        self.db.execute("UPDATE jobs SET status='running', started=? WHERE id=?", (time.time(), row["id"]))
+        self.db.commit()
+        return self.get(row["id"])
+
+    def finish(self, job_id, result=None, error=None):
+        self.db.execute(
+            "UPDATE jobs SET status=?, result=?, error=?, finished=? WHERE id=?",
+            ("failed" if error else "done", json.dumps(result, ensure_ascii=False) if result is not None else None,
+             error, time.time(), job_id),
+        )
+        self.db.commit()
+
+    def get(self, job_id):
+        row = self.db.execute("SELECT * FROM jobs WHERE id=?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["payload"] = json.loads(job["payload"])
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def list(self, status=None, tenant=None, limit=100):
+        query, args = "SELECT id FROM jobs WHERE 1=1", []
+        if status:
+            query += " AND status=?"
+            args.append(status)
+        if tenant:
+            query += " AND tenant=?"
+            args.append(tenant)
+        query += " ORDER BY id DESC LIMIT ?"
+        args.append(int(limit))
+        return [self.get(r["id"]) for r in self.db.execute(query, args).fetchall()]
+
+    def counts(self):
+        counts = {s: 0 for s in STATUSES}
+        for row in self.db.execute("SELECT status, COUNT(*) AS n FROM jobs GROUP BY status"):
+            counts[row["status"]] = row["n"]
+        return counts
+
+    def close(self):
+        self.db.close()
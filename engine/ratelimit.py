@@ -0,0 +1,50 @@
+# engine/ratelimit.py
+# Process-wide limiter for LLM calls: caps concurrent requests and requests per minute,
+# so every run sharing the event loop draws from one coordinated API budget.
+
+import asyncio
+import time
+from collections import deque
+
+class RateLimiter:
+    def __init__(self, max_concurrency=8, requests_per_minute=None):
+        self.max_concurrency = max_concurrency
+        self.requests_per_minute = requests_per_minute
+        self._sem = asyncio.Semaphore(max_concurrency)
+        self._issued = deque()   # monotonic timestamps of requests in the last minute
+        self.in_flight = 0
+        self.total = 0
+        self.wait_seconds = 0.0
+
+    async def __aenter__(self):
+        start = time.monotonic()
+        await self._sem.acquire()
+        try:
+            while self.requests_per_minute:
+                now = time.monotonic()
+                while self._issued and now - self._issued[0] >= 60:
+                    self._issued.popleft()
+                if len(self._issued) < self.requests_per_minute:
+                    break
+                await asyncio.sleep(60 - (now - self._issued[0]))
+        except BaseException:
+            self._sem.release()
+            raise
+        self._issued.append(time.monotonic())
+        self.in_flight += 1
+        self.total += 1
+        self.wait_seconds += time.monotonic() - start
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.in_flight -= 1
+        self._sem.release()
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "requests_per_minute": self.requests_per_minute,
+            "in_flight": self.in_flight,
+            "requests_total": self.total,
+            "wait_seconds_total": round(self.wait_seconds, 3),
+        }
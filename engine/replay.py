@@ -0,0 +1,155 @@
+# engine/replay.py
+# Record every call_gpt request/response (and user Q&A) of a run, and feed them back
+# deterministically in replay mode -- zero LLM calls, prompt drift gets flagged.
+
+import hashlib
+import json
+import logging
+from contextvars import ContextVar
+from pathlib import Path
+
+CALLS_FILE = "gpt_calls.jsonl"
+# Fields that identify a request; anything else (e.g. token budgets) may change between runs
+KEY_FIELDS = ("system", "user", "temperature", "seed", "expect_json")
+# Run parameters stored in the meta line and re-applied on replay (explicit CLI flags still win)
+RUN_PARAMS = (
+    "premise", "process_instruction", "max_iter", "seed", "agent_cap", "board_threshold",
+    "board_temp", "panel_agent_temp", "debate_temp", "max_context_chars",
+)
+
+# ContextVars so that concurrently running replicates each keep their own log
+_recorder = ContextVar("gpt_recorder", default=None)
+_replayer = ContextVar("gpt_replayer", default=None)
+
+class ReplayError(LookupError):
+    pass
+
+class RecordedCallError(RuntimeError):
+    """A call that failed while recording; replay raises it again at the same point."""
+
+def find_calls_file(run_dir):
+    """gpt_calls.jsonl of a run, or its compressed form (compact artifact format)."""
+    for suffix in ("", ".zst", ".gz"):
+        path = Path(run_dir) / (CALLS_FILE + suffix)
+        if path.is_file():
+            return path
+    return None
+
+def request_key(kind, request):
+    if kind == "gpt":
+        ident = [request.get(k) for k in KEY_FIELDS]
+    else:
+        ident = request
+    payload = json.dumps([kind, ident], sort_keys=True, ensure_ascii=False)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()
+
+class CallRecorder:
+    def __init__(self, run_dir, meta=None):
+        self.path = Path(run_dir) / CALLS_FILE
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.count = 0
+        # Fresh log per run; the first line carries the run metadata
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"kind": "meta", "meta": meta or {}}, ensure_ascii=False) + "\n")
+
+    def record(self, kind, request, response, error=None):
+        entry = {
+            "seq": self.count,
+            "kind": kind,
+            "key": request_key(kind, request),
+            "request": request,
+            "response": response,
+        }
+        if error is not None:
+            entry["error"] = error
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self.count += 1
+
+class CallReplayer:
+    def __init__(self, run_dir):
+        from engine.artifacts import open_text  # lazy: artifacts -> utils -> replay
+        self.source = find_calls_file(run_dir) or Path(run_dir) / CALLS_FILE
+        self.meta = {}
+        self.entries = []
+        with open_text(self.source) as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                if entry.get("kind") == "meta":
+                    self.meta = entry.get("meta", {})
+                else:
+                    self.entries.append(entry)
+        self.used = [False] * len(self.entries)
+        self.replayed = 0
+        self.mismatches = []
+        self.stopped = None
+
+    def response_for(self, kind, request, fallback=None):
+        """
+        Return the recorded response for this request.
+        Exact (key) matches are consumed first, in recording order. If the prompt changed,
+        fall back to the next unconsumed recording of the same kind and flag the mismatch.
+        A request beyond the recording is reported as "unrecorded"; it gets `fallback` if one
+        is given, otherwise the replay stops with ReplayError. A call that failed while recording
+        raises RecordedCallError.
+        """
+        key = request_key(kind, request)
+        candidates = [i for i, e in enumerate(self.entries) if not self.used[i] and e["kind"] == kind]
+        if not candidates:
+            self.mismatches.append({"seq": None, "kind": "unrecorded", "request_kind": kind, "actual": request})
+            if fallback is not None:
+                logging.warning(f"Replay: no recorded '{kind}' response left, using fallback")
+                return fallback
+            self.stopped = f"no recorded '{kind}' response left"
+            raise ReplayError(f"Replay log {self.source} has no recorded '{kind}' response left")
+        idx = next((i for i in candidates if self.entries[i]["key"] == key), None)
+        if idx is None:
+            idx = candidates[0]
+            recorded = self.entries[idx]
+            self.mismatches.append({
+                "seq": recorded["seq"],
+                "kind": kind,
+                "recorded": recorded["request"],
+                "actual": request,
+            })
+            logging.warning(f"Replay mismatch at recorded call #{recorded['seq']} ({kind}): request differs from recording")
+        self.used[idx] = True
+        self.replayed += 1
+        if self.entries[idx].get("error") is not None:
+            raise RecordedCallError(self.entries[idx]["error"])
+        return self.entries[idx]["response"]
+
+    def report(self):
+        return {
+            "source": str(self.source),
+            "meta": self.meta,
+            "replayed": self.replayed,
+            "unused": self.used.count(False),
+            "mismatch_count": len(self.mismatches),
+            "mismatches": self.mismatches,
+            "stopped": self.stopped,
+        }
+
+def start_recording(run_dir, meta=None):
+    recorder = CallRecorder(run_dir, meta)
+    _recorder.set(recorder)
+    _replayer.set(None)
+    return recorder
+
+def start_replay(run_dir):
+    replayer = CallReplayer(run_dir)
+    _replayer.set(replayer)
+    _recorder.set(None)
+    return replayer
+
+def stop():
+    _recorder.set(None)
+    _replayer.set(None)
+
+def active_recorder():
+    return _recorder.get()
+
+def active_replayer():
+    return _replayer.get()
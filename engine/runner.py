@@ -0,0 +1,102 @@
+# engine/runner.py
+# One replicate = panel formation + full critique/debate process.
+# Replicates run one after another (interactive) or concurrently behind a BatchCollector.
+
+import asyncio
+from pathlib import Path
+from engine.agent_manager import get_panel
+from engine.batch import BatchCollector, LocalBatchBackend, OpenAIBatchBackend, start_batch
+from engine.controller import run_full_process
+from engine.budgets import OutputBudgets
+from engine.config import thaw
+from engine.gpt_api import get_client, get_output_budgets, set_output_budgets
+from engine.artifacts import compress_file
+from engine.replay import RUN_PARAMS, active_recorder, start_recording, stop
+
+def configure_output_budgets(run_cfg):
+    return set_output_budgets(OutputBudgets(run_cfg.output_budgets, adaptive=run_cfg.adaptive_budgets))
+
+def replicate_run_id(run_cfg, i):
+    return f"run_{i+1:02d}_{run_cfg.board_hash[:6]}"
+
+async def run_replicate(run_cfg, i, run_id, record=True, interactive=True):
+    """Run replicate `i` (seed = run_cfg.seed + i); record its transcript unless replaying."""
+    verbose = run_cfg.verbose
+    seed = run_cfg.seed
+    # Engine code mutates and serializes these, so each replicate works on its own plain copy
+    required_archetypes = thaw(run_cfg.required_archetypes)
+    if record:
+        params = {k: getattr(run_cfg, k) for k in RUN_PARAMS}
+        start_recording(Path("logs") / run_id, meta={"run_id": run_id, "replicate": i, "params": params})
+    try:
+        if verbose:
+            print(f"\n***** Starting multi-run {i+1}/{run_cfg.multi_run} (seed={seed+i}) *****", flush=True)
+            print("Building agent panel...", flush=True)
+        agents, proposals, panel_log = await get_panel(
+            thaw(run_cfg.board_members), run_cfg.premise, run_cfg.process_instruction,
+            run_cfg.panel_agent_temp, run_cfg.agent_cap, run_cfg.board_threshold,
+            user_agents=thaw(run_cfg.user_agents),
+            required_archetypes=required_archetypes,
+            verbose=verbose,
+            master_seed=seed
+        )
+        if verbose:
+            print("[Panel chosen]:")
+            for a in agents:
+                print(f" - {a['name']} (archetype={a.get('archetype')}) — {a['system'][:90]}...")
+            print("Proceeding to critique/debate process.", flush=True)
+        history = await run_full_process(
+            run_cfg.premise, run_cfg.process_instruction, agents, thaw(run_cfg.meta_agent),
+            run_cfg.max_iter, run_id, seed+i, verbose,
+            panel_log=panel_log,
+            required_archetypes=required_archetypes,
+            critique_crossfire_temp=run_cfg.debate_temp,
+            context_char_cap=run_cfg.max_context_chars,
+            interactive=interactive,
+            artifact_format=run_cfg.artifact_format,
+        )
+    finally:
+        recorder = active_recorder()
+        stop()
+        if recorder is not None:
+            # Transcripts are bulky and only read back by --replay: always stored compressed
+            compress_file(recorder.path)
+        budgets = get_output_budgets()
+        if budgets is not None:
+            budgets.save()
+    if verbose:
+        print(f"***** Finished run {i+1} ({run_id}) *****", flush=True)
+    return history
+
+async def _chat_content(body):
+    # Local stand-in answers each batch line with a plain interactive completion
+    response = await get_client().chat.completions.create(**body)
+    return response.choices[0].message.content
+
+def make_batch_collector(run_cfg):
+    batch_dir = Path(run_cfg.batch_dir)
+    if run_cfg.batch == "openai":
+        backend = OpenAIBatchBackend(get_client())
+    else:
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        backend = LocalBatchBackend(batch_dir, _chat_content)
+    return BatchCollector(backend, batch_dir, poll_interval=run_cfg.batch_poll, verbose=run_cfg.verbose)
+
+async def run_batched(run_cfg, collector=None):
+    """All replicates concurrently; each phase's requests across replicates go out as one batch."""
+    collector = start_batch(collector or make_batch_collector(run_cfg))
+    indices = range(run_cfg.multi_run)
+    for _ in indices:
+        collector.register()
+
+    async def _one(i):
+        try:
+            # Unattended sweep: nobody is there to answer agent questions
+            return await run_replicate(run_cfg, i, replicate_run_id(run_cfg, i), interactive=False)
+        finally:
+            collector.release()
+
+    results = await asyncio.gather(*(_one(i) for i in indices))
+    # Only an interrupted sweep is resumed from the manifest
+    collector.finish()
+    return results
@@ -6,11 +6,12 @@ import os
 import hashlib
 import logging
 import yaml, re
+from engine.replay import active_recorder, active_replayer
 
-def atomic_write_json(path, data):
+def atomic_write_json(path, data, indent=2):
     tmp = tempfile.NamedTemporaryFile('w', delete=False, dir=os.path.dirname(path), encoding="utf-8")
     try:
-        json.dump(data, tmp, indent=2, ensure_ascii=False)
+        json.dump(data, tmp, indent=indent, ensure_ascii=False, separators=None if indent else (",", ":"))
         tmp.flush()
         os.fsync(tmp.fileno())
         tmp.close()
@@ -44,6 +45,13 @@ def validate_agents_config(config_path="agents.yaml"):
         if missing:
             raise ValueError(f"Agent missing fields: {missing}")
 
+def clip_text(value, limit):
+    """str(value), capped at `limit` chars (None/0 = no cap) so one phase can't flood the next prompt."""
+    text = str(value)
+    if not limit or len(text) <= limit:
+        return text
+    return text[:limit] + f" ...[truncated {len(text) - limit} chars]"
+
 def load_yaml(path):
     with open(path, "r", encoding="utf-8") as f:
         return yaml.safe_load(f)
@@ -99,7 +107,23 @@ def write_human_log_markdown(path, data):
         if "final" in data:
             f.write(_section("FINAL RESULT", data['final']))
 
-def prompt_user_for_answers(pending_questions, verbose=True):
+def prompt_user_for_answers(pending_questions, verbose=True, interactive=True):
+    # Q&A is part of the transcript: replay serves recorded answers, recording keeps them
+    request = [{"agent": q["agent"], "question": q["question"]} for q in pending_questions]
+    replayer = active_replayer()
+    if replayer is not None:
+        return replayer.response_for("user_answers", request, fallback={q['id']: "Unknown" for q in pending_questions})
+    if interactive:
+        answers = _ask_user(pending_questions)
+    else:
+        # Unattended runs (server jobs): nobody to ask
+        answers = {q['id']: "Unknown" for q in pending_questions}
+    recorder = active_recorder()
+    if recorder is not None:
+        recorder.record("user_answers", request, answers)
+    return answers
+
+def _ask_user(pending_questions):
     print("\n=== AGENTS REQUEST INFORMATION FROM THE USER ===")
     answers = {}
     for i, q in enumerate(pending_questions, 1):
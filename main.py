@@ -4,9 +4,9 @@ import argparse
 import asyncio
 import os
 from pathlib import Path
-from engine.agent_manager import load_board_config, get_panel
-from engine.controller import run_full_process, load_meta_agent
-from engine.utils import load_yaml, file_hash
+from engine.config import ConfigError, build_run_config, load_yaml_cached
+from engine.utils import atomic_write_json
+from engine.replay import CALLS_FILE, RUN_PARAMS, ReplayError, find_calls_file, start_replay
 # ---- Central default values for all supported config keys ----
 DEFAULTS = {
     "config": "config.yaml",
@@ -25,6 +25,13 @@ DEFAULTS = {
     "required_archetypes": "archetypes.yaml",
     "panel_agent_temp": 0.8,
     "debate_temp": 0.7,
+    "batch": None,          # None (interactive) | "openai" (provider Batch API) | "local" (file-based stand-in)
+    "batch_dir": "batches",
+    "batch_poll": 30.0,     # seconds between batch status polls
+    "output_budgets": None,   # {phase: max_tokens}; phases: panel, critique, crossfire, synthesis, meta
+    "adaptive_budgets": True, # learn per-phase budgets from observed output sizes
+    "max_context_chars": 12000,  # cap on each critique/crossfire block carried into the next phase
+    "artifact_format": "json",   # "json" (pretty summary + Markdown) | "compact" (compressed history, index only)
 }
 # ----- Argument-to-config key mapping (for CLI <-> config merge) -----
 ARG_TO_CONF = {
@@ -44,6 +51,13 @@ ARG_TO_CONF = {
     "required_archetypes": "required_archetypes",
     "panel_agent_temp": "panel_agent_temp",
     "debate_temp": "debate_temp",
+    "batch": "batch",
+    "batch_dir": "batch_dir",
+    "batch_poll": "batch_poll",
+    "output_budgets": "output_budgets",
+    "adaptive_budgets": "adaptive_budgets",
+    "max_context_chars": "max_context_chars",
+    "artifact_format": "artifact_format",
 }
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -63,6 +77,13 @@ def parse_args():
     parser.add_argument("--required-archetypes", type=str, default=None, help="YAML file with required archetypes")
     parser.add_argument("--panel-agent-temp", type=float, default=None, help="Temperature for agent archetype/panel creation")
     parser.add_argument("--debate-temp", type=float, default=None, help="Temperature for critique/crossfire/synthesis")
+    parser.add_argument("--batch", type=str, choices=["openai", "local"], default=None, help="Run all replicates through a batch interface (unattended sweeps)")
+    parser.add_argument("--batch-dir", type=str, default=None, help="Directory for batch input/output files")
+    parser.add_argument("--batch-poll", type=float, default=None, help="Seconds between batch status polls")
+    parser.add_argument("--no-adaptive-budgets", dest="adaptive_budgets", action="store_false", default=None, help="Use configured per-phase max_tokens only")
+    parser.add_argument("--max-context-chars", type=int, default=None, help="Cap on critique text carried into the next phase (0 = no cap)")
+    parser.add_argument("--artifact-format", type=str, choices=["json", "compact"], default=None, help="Run artifact layout (compact = compressed history, Markdown on demand)")
+    parser.add_argument("--replay", type=str, default=None, help="Re-execute a recorded run (logs/<run_id>) with zero LLM calls")
     return parser.parse_args()
 def merge_config_and_args(cli_args, config: dict):
     """Merges CLI arguments with config, giving CLI priority, then config, then DEFAULTS."""
@@ -81,81 +102,54 @@ async def main():
     if not os.path.isfile(config_file):
         print(f"ERROR: Config file '{config_file}' not found.")
         exit(1)
-    config_data = load_yaml(config_file)
+    config_data = load_yaml_cached(config_file)
     # Step 2: Merge (CLI > config > defaults), all keys
     cfg = merge_config_and_args(args, config_data)
-    # Step 3: Validate required keys
-    missing_keys = [k for k in ("premise", "process_instruction") if not cfg.get(k)]
-    if missing_keys:
-        print(f"ERROR: Required fields missing: {', '.join(missing_keys)}. (Supply in config or CLI)")
-        exit(1)
-    # Step 4: Assemble run parameters
-    max_iter = int(cfg["max_iter"])
-    num_runs = int(cfg["multi_run"])
-    seed = int(cfg["seed"])
-    verbose = bool(cfg["verbose"])
-    agent_cap = int(cfg["agent_cap"])
-    board_threshold = int(cfg["board_threshold"])
-    board_temp = float(cfg["board_temp"])
-    meta_agent_path = cfg["meta_agent"]
-    board_path = cfg["board"]
-    premise = cfg["premise"]
-    process_instruction = cfg["process_instruction"]
-    panel_agent_temp = float(cfg["panel_agent_temp"])
-    debate_temp = float(cfg["debate_temp"])
-    # Step 5: Load YAML configs
-    meta_agent = load_meta_agent(meta_agent_path)
-    board_members = load_board_config(board_path)
-
-    # ---- updated: Load user agents and required archetype list
-    user_agents_path = cfg.get("user_agents")
-    user_agents = []
-    if user_agents_path:
-        if not os.path.isfile(user_agents_path):
-            print(f"ERROR: User agent archetype file '{user_agents_path}' not found.")
-            exit(1)
-        loaded = load_yaml(user_agents_path)
-        if "agents" in loaded:
-            user_agents = loaded["agents"]
-        else:
-            print(f"ERROR: Missing 'agents' key in '{user_agents_path}'")
+    replayer = None
+    if args.replay:
+        replay_dir = Path(args.replay)
+        if find_calls_file(replay_dir) is None:
+            print(f"ERROR: No recorded calls ('{CALLS_FILE}') found in '{replay_dir}'.")
             exit(1)
-    required_archetypes_path = cfg.get("required_archetypes") or DEFAULTS["required_archetypes"]
-    if not os.path.isfile(required_archetypes_path):
-        print(f"ERROR: Archetypes file '{required_archetypes_path}' not found.")
+        replayer = start_replay(replay_dir)
+        # Replay with the recorded run parameters (CLI > recording > config > defaults)
+        meta = replayer.meta
+        recorded = meta.get("params") or {k: v for k, v in meta.items() if k in RUN_PARAMS}
+        for key, value in recorded.items():
+            if key in cfg and getattr(args, key, None) is None:
+                cfg[key] = value
+    # Step 3: Validate + load every referenced YAML once (cached, mtime-keyed)
+    try:
+        run_cfg = build_run_config(cfg)
+    except ConfigError as e:
+        print(f"ERROR: {e}")
         exit(1)
-    req_arch_loaded = load_yaml(required_archetypes_path)
-    if "required_archetypes" not in req_arch_loaded:
-        print(f"ERROR: Missing 'required_archetypes' in '{required_archetypes_path}'")
-        exit(1)
-    required_archetypes = req_arch_loaded["required_archetypes"]
+    # Heavy engine modules are only imported once the config is known to be good
+    from engine.runner import configure_output_budgets, replicate_run_id, run_replicate, run_batched
+    configure_output_budgets(run_cfg)
+
+    # Replay mode: one run, fed from a recorded transcript instead of the API.
+    # Output goes under logs/replays/ so it never mixes with real runs (aggregate.py globs logs/run_*)
+    if replayer is not None:
+        run_id = f"replays/{replay_dir.name}"
+        try:
+            # Re-use the recorded replicate index so the seeds line up with the recording
+            await run_replicate(run_cfg, int(replayer.meta.get("replicate", 0)), run_id, record=False)
+        except ReplayError as e:
+            print(f"Replay stopped early: {e}", flush=True)
+        finally:
+            report = replayer.report()
+            (Path("logs") / run_id).mkdir(parents=True, exist_ok=True)
+            atomic_write_json(Path("logs") / run_id / "replay_report.json", report)
+            print(f"Replay of {replay_dir}: {report['replayed']} responses served, "
+                  f"{report['mismatch_count']} request mismatches, {report['unused']} recordings unused.", flush=True)
+        return
 
-    # Step 6: Run
-    for i in range(num_runs):
-        run_id = f"run_{i+1:02d}_{file_hash(board_path)[:6]}"
-        if verbose:
-            print(f"\n***** Starting multi-run {i+1}/{num_runs} (seed={seed+i}) *****", flush=True)
-            print("Building agent panel...", flush=True)
-        agents, proposals, panel_log = await get_panel(
-            board_members, premise, process_instruction, panel_agent_temp, agent_cap, board_threshold,
-            user_agents=user_agents,
-            required_archetypes=required_archetypes,
-            verbose=verbose,
-            master_seed=seed
-        )
-        if verbose:
-            print("[Panel chosen]:")
-            for a in agents:
-                print(f" - {a['name']} (archetype={a.get('archetype')}) — {a['system'][:90]}...")
-            print("Proceeding to critique/debate process.", flush=True)
-        await run_full_process(
-            premise, process_instruction, agents, meta_agent,
-            max_iter, run_id, seed+i, verbose,
-            panel_log=panel_log,
-            required_archetypes=required_archetypes,
-            critique_crossfire_temp=debate_temp,
-        )
-        if verbose:
-            print(f"***** Finished run {i+1} ({run_id}) *****", flush=True)
+    # Step 4: Run
+    if run_cfg.batch:
+        await run_batched(run_cfg)
+        return
+    for i in range(run_cfg.multi_run):
+        await run_replicate(run_cfg, i, replicate_run_id(run_cfg, i))
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
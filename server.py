@@ -0,0 +1,247 @@
+# server.py -- Long-lived job server for shared/multi-tenant use
+#
+# Accepts run jobs over a small local HTTP API (TCP or Unix socket) into a durable SQLite queue,
+# and runs them on ONE event loop: one OpenAI client, one config cache, one set of learned
+# output budgets, and one global rate limiter instead of N processes fighting over the quota.
+#
+#   POST /jobs          {"premise": ..., "process_instruction": ..., "replicates": 3,
+#                        "tenant": "acme", "priority": 5, "config": {...JOB_CONFIG_KEYS only...}}
+#   GET  /jobs          ?status=queued&tenant=acme
+#   GET  /jobs/<id>
+#   GET  /status        JSON: queue counts, running jobs per tenant, limiter stats
+#   GET  /metrics       Prometheus text format
+
+import argparse
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit, parse_qs
+from engine.budgets import OutputBudgets
+from engine.config import ConfigError, build_run_config, check_output_budgets, load_yaml_cached
+from engine.gpt_api import set_output_budgets, set_rate_limiter
+from engine.jobqueue import JobQueue
+from engine.ratelimit import RateLimiter
+from main import DEFAULTS
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--config", type=str, default=None, help="Base YAML config; jobs may override its run parameters")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", type=str, default=None, help="Listen on a Unix socket instead of TCP")
+    parser.add_argument("--db", type=str, default="jobs.sqlite3", help="SQLite job queue file")
+    parser.add_argument("--max-jobs", type=int, default=4, help="Jobs running at once (all tenants)")
+    parser.add_argument("--tenant-cap", type=int, default=2, help="Default jobs running at once per tenant")
+    parser.add_argument("--tenant-caps", type=str, default="", help="Per-tenant overrides, e.g. 'acme=4,beta=1'")
+    parser.add_argument("--max-concurrency", type=int, default=8, help="LLM requests in flight (global)")
+    parser.add_argument("--rpm", type=int, default=None, help="LLM requests per minute (global)")
+    parser.add_argument("--max-replicates", type=int, default=20, help="Most replicates a single job may request")
+    return parser.parse_args()
+
+def parse_tenant_caps(spec):
+    caps = {}
+    for item in filter(None, (s.strip() for s in spec.split(","))):
+        tenant, _, cap = item.partition("=")
+        caps[tenant.strip()] = int(cap)
+    return caps
+
+# Run parameters a job may override. File paths stay server-side (no probing of host files),
+# and output budgets are process-wide (shared, learned across jobs), so neither is per job.
+JOB_CONFIG_KEYS = {
+    "premise", "process_instruction", "max_iter", "multi_run", "seed", "verbose", "agent_cap",
+    "board_threshold", "board_temp", "panel_agent_temp", "debate_temp", "max_context_chars",
+    "artifact_format",
+}
+
+def prom_label(value):
+    # Prometheus label values: escape backslash, double quote and newline
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def job_run_config(base, payload, max_replicates=None):
+    """Job payload on top of the server's base config on top of DEFAULTS -> validated RunConfig."""
+    overrides = payload.get("config") or {}
+    if not isinstance(overrides, dict):
+        raise ConfigError("'config' must be a mapping of run config keys")
+    rejected = sorted(set(overrides) - JOB_CONFIG_KEYS)
+    if rejected:
+        raise ConfigError(f"Config keys not allowed in jobs: {', '.join(map(str, rejected))} "
+                          f"(allowed: {', '.join(sorted(JOB_CONFIG_KEYS))})")
+    cfg = dict(DEFAULTS)
+    cfg.update(base or {})
+    cfg.update(overrides)
+    for key in ("premise", "process_instruction"):
+        if payload.get(key):
+            cfg[key] = payload[key]
+    if payload.get("replicates") is not None:
+        cfg["multi_run"] = payload["replicates"]
+    cfg["batch"] = None       # server jobs are interactive calls behind the shared limiter
+    run_cfg = build_run_config(cfg)
+    if max_replicates and run_cfg.multi_run > max_replicates:
+        raise ConfigError(f"A job may run at most {max_replicates} replicates (got {run_cfg.multi_run})")
+    return run_cfg
+
+class JobServer:
+    def __init__(self, queue, base_config, limiter, max_jobs=4, tenant_cap=2, tenant_caps=None, max_replicates=20):
+        self.queue = queue
+        self.base_config = base_config
+        self.limiter = limiter
+        self.max_jobs = max_jobs
+        self.tenant_cap = tenant_cap
+        self.tenant_caps = tenant_caps or {}
+        self.max_replicates = max_replicates
+        self.running = {}    # job id -> tenant
+        self.wakeup = asyncio.Event()
+        self.started = time.time()
+        self.finished = {"done": 0, "failed": 0}
+
+    def _blocked_tenants(self):
+        per_tenant = {}
+        for tenant in self.running.values():
+            per_tenant[tenant] = per_tenant.get(tenant, 0) + 1
+        return [t for t, n in per_tenant.items() if n >= self.tenant_caps.get(t, self.tenant_cap)]
+
+    async def schedule(self):
+        while True:
+            while len(self.running) < self.max_jobs:
+                job = self.queue.claim_next(self._blocked_tenants())
+                if job is None:
+                    break
+                self.running[job["id"]] = job["tenant"]
+                asyncio.ensure_future(self.run_job(job))
+            self.wakeup.clear()
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=5)
+            except asyncio.TimeoutError:
+                pass
+
+    async def run_job(self, job):
+        from engine.runner import replicate_run_id, run_replicate
+        try:
+            run_cfg = job_run_config(self.base_config, job["payload"], self.max_replicates)
+
+            async def _one(i):
+                run_id = f"job{job['id']:05d}_{replicate_run_id(run_cfg, i)}"
+                history = await run_replicate(run_cfg, i, run_id, interactive=False)
+                final = history[-1]["synthesis"].get("refined_idea") if history else run_cfg.premise
+                return {"run_id": run_id, "iterations": len(history), "final": final}
+
+            runs = await asyncio.gather(*(_one(i) for i in range(run_cfg.multi_run)))
+            self.queue.finish(job["id"], result={"runs": runs})
+            self.finished["done"] += 1
+        except Exception as e:
+            self.queue.finish(job["id"], error=repr(e))
+            self.finished["failed"] += 1
+        finally:
+            del self.running[job["id"]]
+            self.wakeup.set()
+
+    def status(self):
+        per_tenant = {}
+        for tenant in self.running.values():
+            per_tenant[tenant] = per_tenant.get(tenant, 0) + 1
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "jobs": self.queue.counts(),
+            "running": sorted(self.running),
+            "running_per_tenant": per_tenant,
+            "max_jobs": self.max_jobs,
+            "tenant_cap": self.tenant_cap,
+            "tenant_caps": self.tenant_caps,
+            "finished_since_start": self.finished,
+            "limiter": self.limiter.stats(),
+        }
+
+    def metrics(self):
+        status = self.status()
+        lines = [f"cfe_uptime_seconds {status['uptime_seconds']}"]
+        for state, n in status["jobs"].items():
+            lines.append(f'cfe_jobs{{status="{state}"}} {n}')
+        for tenant, n in status["running_per_tenant"].items():
+            lines.append(f'cfe_jobs_running{{tenant="{prom_label(tenant)}"}} {n}')
+        limiter = status["limiter"]
+        lines += [
+            f"cfe_llm_requests_total {limiter['requests_total']}",
+            f"cfe_llm_requests_in_flight {limiter['in_flight']}",
+            f"cfe_llm_limiter_wait_seconds_total {limiter['wait_seconds_total']}",
+        ]
+        return "\n".join(lines) + "\n"
+
+    def route(self, method, target, body):
+        url = urlsplit(target)
+        parts = [p for p in url.path.split("/") if p]
+        query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        if method == "POST" and parts == ["jobs"]:
+            payload = json.loads(body or b"{}")
+            try:
+                job_run_config(self.base_config, payload, self.max_replicates)   # reject bad jobs before they are queued
+            except ConfigError as e:
+                return 400, {"error": str(e)}
+            job_id = self.queue.submit(payload, tenant=str(payload.get("tenant") or "default"),
+                                       priority=int(payload.get("priority") or 0))
+            self.wakeup.set()
+            return 201, {"id": job_id, "status": "queued"}
+        if method == "GET" and parts == ["jobs"]:
+            return 200, {"jobs": self.queue.list(query.get("status"), query.get("tenant"), query.get("limit", 100))}
+        if method == "GET" and len(parts) == 2 and parts[0] == "jobs" and parts[1].isdigit():
+            job = self.queue.get(int(parts[1]))
+            return (200, job) if job else (404, {"error": "no such job"})
+        if method == "GET" and parts == ["status"]:
+            return 200, self.status()
+        if method == "GET" and parts == ["metrics"]:
+            return 200, self.metrics()
+        return 404, {"error": f"no route for {method} {url.path}"}
+
+    async def handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode("latin-1").strip()
+            method, target = request_line.split(" ")[:2]
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                key, _, value = line.decode("latin-1").partition(":")
+                headers[key.strip().lower()] = value.strip()
+            body = await reader.readexactly(int(headers.get("content-length") or 0))
+            status, payload = self.route(method, target, body)
+        except Exception as e:
+            status, payload = 400, {"error": repr(e)}
+        if isinstance(payload, str):
+            data, ctype = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            data, ctype = json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json"
+        reason = {200: "OK", 201: "Created", 400: "Bad Request", 404: "Not Found"}.get(status, "")
+        writer.write(
+            f"HTTP/1.1 {status} {reason}\r\nContent-Type: {ctype}\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode("latin-1") + data
+        )
+        try:
+            await writer.drain()
+        finally:
+            writer.close()
+
+async def serve():
+    args = parse_args()
+    base_config = load_yaml_cached(args.config) if args.config else {}
+    try:
+        budgets = check_output_budgets(base_config.get("output_budgets"))
+    except ConfigError as e:
+        print(f"ERROR: {e}")
+        exit(1)
+    limiter = set_rate_limiter(RateLimiter(args.max_concurrency, args.rpm))
+    set_output_budgets(OutputBudgets(budgets, adaptive=base_config.get("adaptive_budgets") is not False))
+    queue = JobQueue(args.db)
+    server = JobServer(queue, base_config, limiter, args.max_jobs, args.tenant_cap, parse_tenant_caps(args.tenant_caps),
+                       args.max_replicates)
+    if args.socket:
+        listener = await asyncio.start_unix_server(server.handle, path=args.socket)
+        where = args.socket
+    else:
+        listener = await asyncio.start_server(server.handle, args.host, args.port)
+        where = f"http://{args.host}:{args.port}"
+    print(f"Job server listening on {where} (queue: {args.db}, {queue.requeued} interrupted jobs re-queued)", flush=True)
+    async with listener:
+        await server.schedule()
+
+if __name__ == "__main__":
+    asyncio.run(serve())